@@ -1,47 +1,60 @@
 #!/usr/bin/env python3
 import sys
 import os
+import io
 import argparse
 import csv
 import tomllib
 import tomli_w
 
+from functools import cache, lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
-from gradescope_api.client import GradescopeClient
-from piazza_api import Piazza
 
 tools_dir = Path(__file__).parent
-settings_path = Path(f"{tools_dir}/settings.toml")
+settings_path = tools_dir / "settings.toml"
+courses_dir = tools_dir / "courses"
+
+@cache
+def load_env():
+    # dotenv (and the API clients below) are imported lazily so that runs
+    # which never touch the network skip their import cost
+    from dotenv import load_dotenv
+    load_dotenv()
+
+@lru_cache(maxsize=1)
+def _parse_settings(mtime_ns):
+    with open(settings_path, "rb") as handle:
+        return tomllib.load(handle)
+
+def load_settings():
+    # keyed by mtime so writes (ours or external edits) invalidate the cache
+    return _parse_settings(settings_path.stat().st_mtime_ns)
+
+def normalize_name(name_str):
+    # rosters export names as "Last, First"; flip to "first last"
+    last, sep, first = name_str.partition(",")
+    return f"{first.strip()} {last.strip()}".lower() if sep else last.lower()
 
 def read_piazza_roster(csv_path):
-    roster = {}
-    with open(csv_path, newline="") as handle:
+    # read through a 1 MiB buffer so big roster exports stream in large
+    # chunks instead of the default small reads
+    with open(csv_path, "rb", buffering=1<<20) as raw:
+        handle = io.TextIOWrapper(raw, newline="", encoding="utf-8")
         roster_reader = csv.reader(handle)
-        header=next(roster_reader)
-        for entry in roster_reader:
-            if entry[2] == "Student":
-                name = entry[0].split(",")
-                if len(name) == 1:
-                    pz_name = name[0]
-                elif len(name) == 2:
-                    pz_name = f"{name[1].strip()} {name[0].strip()}"
-                else:
-                    pz_name = f"{name[1].strip()} {name[0].strip()}"
-                email = entry[1]
-                roster[pz_name.lower()] = email
-    return roster
-
-def make_course_entry(identifier, gs_id, roster, course_path=Path(f"{tools_dir}/courses")):
-    settings = tomllib.loads(settings_path.read_text())
+        next(roster_reader) # skip the header
+        return {normalize_name(entry[0]): entry[1]
+                for entry in roster_reader if entry[2] == "Student"}
+
+def make_course_entry(identifier, gs_id, roster, course_path=courses_dir):
+    settings = load_settings()
     if identifier in settings["courses"]:
         print(f"WARNING: Course with identifier \"{identifier}\" already exists, overwriting")
     else:
         settings["courses"].append(identifier)
     course_dir = Path(course_path)
     course_dir.mkdir(exist_ok=True)
-    
-    cfg_path = Path(f"{course_path}/{identifier}.toml")
+
+    cfg_path = course_dir / f"{identifier}.toml"
     cfg = {
         "gradescope-id" : gs_id,
         "roster" : roster
@@ -62,7 +75,7 @@ def initialize_settings():
         return
     print("Settings file not found, initializing to defaults.")
     default_settings = {
-        "course_path" : f"{tools_dir}/courses",
+        "course_path" : str(courses_dir),
         "courses" : [],
         "default-to-newest" : True,
         "default-length" : 5
@@ -82,15 +95,17 @@ def yes_no_helper():
     return option
 
 def interactive_setup():
-    load_dotenv()
-    settings = tomllib.loads(settings_path.read_text())
+    from gradescope_api.client import GradescopeClient
+
+    load_env()
+    settings = load_settings()
 
     print("Connecting to gradescope...\n")
     gs_client = GradescopeClient(email=os.environ["GS_EMAIL"], password=os.environ["GS_PASSWORD"])
     gs_courses = gs_client.get_courses()
     
     print("Enter the number (i) of the course to use for configuring:")
-    longest_name_len = max(map(lambda x: len(x.get_name()), gs_courses))
+    longest_name_len = max(len(course.get_name()) for course in gs_courses)
     for ix,course in enumerate(gs_courses):
         course_name = course.get_name() 
         print(f"  ({ix+1}) {course_name:<{longest_name_len}}\t{course.get_term()}\t{course.course_id}")
@@ -116,12 +131,14 @@ def interactive_setup():
             roster_path = Path(input("Path not found, try again: "))
         roster = read_piazza_roster(roster_path)
     else:
+        from piazza_api import Piazza
+
         print("\nConnecting to piazza...")
         pz_client = Piazza()
         pz_client.user_login(email=os.environ["PZ_EMAIL"], password=os.environ["PZ_PASSWORD"])
         pz_courses = [x for x in filter(lambda x: x["is_ta"], pz_client.get_user_classes())]
         print("Enter the number (i) of the piazza course to use:")
-        longest_name_len = max(map(lambda x: len(x["num"]), pz_courses))
+        longest_name_len = max(len(course["num"]) for course in pz_courses)
         for ix,course in enumerate(pz_courses):
             course_name = course["num"]
             course_term = course["term"]
@@ -138,25 +155,22 @@ def interactive_setup():
             else:
                 ix = None
         pz_course = pz_client.network(pz_courses[ix]["nid"])
-        students = filter(lambda x: x["role"] == "student", pz_course.get_all_users())
-        valid_emails = set(gs_student.email for gs_student in gs_course.get_roster())
+        students = [user for user in pz_course.get_all_users() if user["role"] == "student"]
+        valid_emails = frozenset(gs_student.email for gs_student in gs_course.get_roster())
         roster = {}
         sans_emails = []
         for student in students:
             name = student["name"].lower()
             emails = student["email"].split(", ")
-            valid_email = None
-            for email in emails:
-                if email in valid_emails:
-                    valid_email = email
-                    break
+            valid_email = next(iter(valid_emails.intersection(emails)), None)
             if valid_email is None:
                 sans_emails.append(name)
                 # probably implement a check to see if that student even is enrolled in gradescope
             else:
-                roster[name] = email
+                roster[name] = valid_email
         if sans_emails:
-            print(f"Warning: could not find an email for the following students. Check to make sure they aren't enrolled on gradescope\n  {'\n  '.join(sans_emails)}")
+            sans_emails_str = "\n  ".join(sans_emails)
+            print(f"Warning: could not find an email for the following students. Check to make sure they aren't enrolled on gradescope\n  {sans_emails_str}")
     
     identifier = None
     while identifier is None:
@@ -189,10 +203,12 @@ def main():
     parser = config_parser()
     cfg_args = parser.parse_args()
     if cfg_args.list:
-        load_dotenv()
+        from gradescope_api.client import GradescopeClient
+
+        load_env()
         gs_client = GradescopeClient(email=os.environ["GS_EMAIL"], password=os.environ["GS_PASSWORD"])
         gs_courses = gs_client.get_courses()
-        longest_name_len = max(map(lambda x: len(x.get_name()), gs_courses))
+        longest_name_len = max(len(course.get_name()) for course in gs_courses)
         print(f"ID\tcourse Name{' '*(max(0,longest_name_len-11))}\tTerm")
         for ix,course in enumerate(gs_courses):
             course_name = course.get_name()
@@ -1,58 +1,168 @@
 #!/usr/bin/env python3
 import os
 import argparse
-import csv
 import tomllib
+import unicodedata
 
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from gradescope_api.client import GradescopeClient
-from gradescope_api.course import GradescopeCourse
-
 tools_dir = Path(__file__).parent
-settings_path = Path(f"{tools_dir}/settings.toml")
-if not settings_path.exists():
-    print("No settings found, be sure to run ./gs-config.py first!")
-    exit(0)
-settings = tomllib.loads(settings_path.read_text())
-if len(settings["courses"]) == 0:
-    print("No courses found, make sure you configure a course with ./gs-config.py first!")
-    exit(0)
-
-load_dotenv()
-
-parser = argparse.ArgumentParser()
-parser.add_argument("-i", "--id", choices=settings["courses"], default=settings["default-course"], help="Course identifier")
-parser.add_argument("names", nargs="*", help="student names")
-parser.add_argument("-d", "--days", type=int, default=settings["default-length"], help="Number of days after deadline to extend the assignment. Does not stack with other extensions.")
-# probably default to the most recent assignment? for now just leave it as this
-parser.add_argument("-s", "--string", required=True, help="String for assignment titles to contain (e.g. -s hw4 to apply extension to all assignments with 'hw4' in the title)")
-# parser.add_argument("-r", "--regex", help="Regex string to match assignment titles to")
-
-args = parser.parse_args()
-if len(args.names) == 0:
-    print("No names supplied, exiting..")
-    exit(0)
-course_info_path = Path(f"{settings['course_path']}/{args.id}.toml")
-course_info = tomllib.loads(course_info_path.read_text())
-roster = course_info["roster"]
-
-client = GradescopeClient(email=os.environ["GS_EMAIL"], password=os.environ["GS_PASSWORD"])
-course = client.get_course(course_id=course_info['gradescope-id'])
-assignments = course.get_assignments(args.string)
-print("Processing extensions for the following assignments: ")
-for assign in assignments:
-    print("  ", assign.get_name())
-print("For the following students:")
-for raw_name in args.names:
-    student_name = raw_name.lower()
-    if student_name not in roster:
-        print(f"Could not find {student_name} in the roster")
-        # TODO: try to find a reasonable match in the roster?
-        continue
-    else:
+settings_path = tools_dir / "settings.toml"
+session_cache_path = Path.home() / ".cache" / "gs-tools" / "session.pkl"
+
+# Extensions are applied over the network, one request per (assignment, student)
+# pair, so issue them from a thread pool instead of one blocking call at a time.
+MAX_WORKERS = 16
+
+def lnrm(name):
+    """Normalize a name so accent/spacing/punctuation variants compare equal:
+    lowercase, strip diacritics, drop everything non-alphanumeric."""
+    return "".join(c for c in unicodedata.normalize("NFKD", name.lower()) if c.isalnum())
+
+def get_client(use_cache=True):
+    """Log in to gradescope, reusing the pickled session cookies from the last
+    run if they still authenticate - skips the login round-trip entirely."""
+    import pickle
+    import requests
+    from gradescope_api.client import GradescopeClient
+
+    if use_cache and session_cache_path.exists():
+        client = GradescopeClient.__new__(GradescopeClient)
+        client.session = requests.Session()
+        try:
+            with open(session_cache_path, "rb") as handle:
+                client.session.cookies.update(pickle.load(handle))
+            probe = client.session.get("https://www.gradescope.com/account", allow_redirects=False)
+            if probe.status_code == 200:
+                return client
+        except Exception:
+            pass # stale or corrupt cache, fall through to a fresh login
+    client = GradescopeClient(email=os.environ["GS_EMAIL"], password=os.environ["GS_PASSWORD"])
+    session_cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(session_cache_path, "wb") as handle:
+        pickle.dump(client.session.cookies, handle)
+    return client
+
+# full assignment listings per course_id, fetched at most once per run
+_assignment_cache = {}
+
+def get_assignments_matching(course, filter_str):
+    """Fetch the course's complete assignment list once and do the title
+    filtering locally, so changing the filter costs no extra round-trips."""
+    assignments = _assignment_cache.get(course.course_id)
+    if assignments is None:
+        assignments = course.get_assignments("")
+        _assignment_cache[course.course_id] = assignments
+    return [a for a in assignments if filter_str in a.get_name()]
+
+def pick_close_match(student_name, close_matches):
+    print(f"Could not find {student_name} in the roster, did you mean one of these?")
+    for ix,match in enumerate(close_matches):
+        print(f"  ({ix+1}) {match}")
+    choice = input("Selection (blank to skip): ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(close_matches):
+        return close_matches[int(choice)-1]
+    return None
+
+def main():
+    if not settings_path.exists():
+        print("No settings found, be sure to run ./gs-config.py first!")
+        exit(0)
+    with open(settings_path, "rb") as handle:
+        settings = tomllib.load(handle)
+    if len(settings["courses"]) == 0:
+        print("No courses found, make sure you configure a course with ./gs-config.py first!")
+        exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--id", choices=settings["courses"], default=settings["default-course"], help="Course identifier")
+    parser.add_argument("names", nargs="*", help="student names")
+    parser.add_argument("-d", "--days", type=int, default=settings["default-length"], help="Number of days after deadline to extend the assignment. Does not stack with other extensions.")
+    # probably default to the most recent assignment? for now just leave it as this
+    parser.add_argument("-s", "--string", required=True, help="String for assignment titles to contain (e.g. -s hw4 to apply extension to all assignments with 'hw4' in the title)")
+    # parser.add_argument("-r", "--regex", help="Regex string to match assignment titles to")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the cached gradescope session and log in fresh")
+
+    args = parser.parse_args()
+    if len(args.names) == 0:
+        print("No names supplied, exiting..")
+        exit(0)
+
+    # deferred so --help and the early exits above don't pay for these imports
+    from dotenv import load_dotenv
+    from rapidfuzz import process, fuzz
+
+    load_dotenv()
+    course_info_path = Path(settings["course_path"]) / f"{args.id}.toml"
+    with open(course_info_path, "rb") as handle:
+        course_info = tomllib.load(handle)
+    roster = course_info["roster"]
+    roster_names = list(roster)
+    # lookup cascade for argv names: exact -> normalized -> last name -> fuzzy,
+    # so common typos resolve with a hash lookup before rapidfuzz gets involved
+    lnrm_index = {lnrm(name): name for name in roster_names}
+    last_name_index = {}
+    for name in roster_names:
+        last_name_index.setdefault(name.split()[-1], []).append(name)
+
+    client = get_client(use_cache=not args.no_cache)
+    course = client.get_course(course_id=course_info['gradescope-id'])
+    assignments = get_assignments_matching(course, args.string)
+    print("Processing extensions for the following assignments: ")
+    for assign in assignments:
+        print("  ", assign.get_name())
+    print("For the following students:")
+    pending = []
+    applied = set() # (assignment_id, email) pairs already queued
+    for raw_name in args.names:
+        student_name = raw_name.lower()
+        if student_name not in roster:
+            normalized = lnrm(student_name)
+            if normalized in lnrm_index:
+                student_name = lnrm_index[normalized]
+            elif student_name in last_name_index:
+                candidates = last_name_index[student_name]
+                if len(candidates) == 1:
+                    print(f"Could not find {student_name} in the roster, assuming {candidates[0]}")
+                    student_name = candidates[0]
+                else:
+                    student_name = pick_close_match(student_name, candidates)
+                    if student_name is None:
+                        continue
+            else:
+                close_matches = [match for match,score,_ in process.extract(
+                    student_name, roster_names, scorer=fuzz.WRatio, limit=5, score_cutoff=70)]
+                if len(close_matches) == 0:
+                    print(f"Could not find {student_name} in the roster")
+                    continue
+                elif len(close_matches) == 1:
+                    print(f"Could not find {student_name} in the roster, assuming {close_matches[0]}")
+                    student_name = close_matches[0]
+                else:
+                    student_name = pick_close_match(student_name, close_matches)
+                    if student_name is None:
+                        continue
         email = roster[student_name]
-    print(f"  {student_name} ({email})")
-    for assignment in assignments:
-        assignment.apply_extension(roster[student_name], args.days)
+        print(f"  {student_name} ({email})")
+        for assignment in assignments:
+            key = (assignment.assignment_id, email)
+            if key in applied:
+                continue
+            applied.add(key)
+            pending.append((assignment, email))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(assignment.apply_extension, email, args.days): (assignment, email)
+            for assignment, email in pending
+        }
+        for future in as_completed(futures):
+            assignment, email = futures[future]
+            try:
+                future.result()
+            except Exception as err:
+                print(f"Failed to extend {assignment.get_name()} for {email}: {err}")
+
+if __name__ == "__main__":
+    main()